@@ -1,6 +1,7 @@
+import io
 import logging
-from pathlib import Path
-from flask import Blueprint, request, send_file, jsonify
+from flask import Blueprint, Response, abort, request, jsonify
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 
 logger = logging.getLogger(__name__)
@@ -11,6 +12,9 @@ api_bp = Blueprint('api', __name__)
 # Global service instance (injected from app.py)
 _noise_service = None
 
+# Lowercase '.ext' suffixes accepted for upload (computed in init_api)
+_ALLOWED_SUFFIXES = ('.wav',)
+
 
 def init_api(noise_service, config):
     """
@@ -20,19 +24,17 @@ def init_api(noise_service, config):
         noise_service: Instance of NoiseReductionService
         config: Flask config object
     """
-    global _noise_service, _config
+    global _noise_service, _config, _ALLOWED_SUFFIXES
     _noise_service = noise_service
     _config = config
-    
-    # Create upload folder if needed
-    config['UPLOAD_FOLDER'].mkdir(exist_ok=True)
+    _ALLOWED_SUFFIXES = tuple(
+        '.' + ext.lower() for ext in config.get('ALLOWED_EXTENSIONS', {'wav'})
+    )
 
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    allowed_extensions = _config.get('ALLOWED_EXTENSIONS', {'wav'})
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in allowed_extensions
+    return filename.lower().endswith(_ALLOWED_SUFFIXES)
 
 
 @api_bp.route('/health', methods=['GET'])
@@ -73,8 +75,11 @@ def denoise_audio():
         Denoised audio file (.wav) on success
         JSON error message on failure
     """
-    input_path = None
-    output_path = None
+    # Reject oversized uploads before reading the body
+    max_length = _config.get('MAX_CONTENT_LENGTH')
+    if max_length and request.content_length and \
+            request.content_length > max_length:
+        abort(413)
     
     try:
         # Validate request has file
@@ -99,44 +104,23 @@ def denoise_audio():
         # Secure the filename
         filename = secure_filename(file.filename)
         
-        # Generate paths
-        upload_folder = _config['UPLOAD_FOLDER']
-        input_path = upload_folder / f'input_{filename}'
-        output_path = upload_folder / f'denoised_{filename}'
-        
-        # Save uploaded file
-        logger.info(f"Saving uploaded file: {filename}")
-        file.save(str(input_path))
-        
-        # Process audio using service
-        logger.info(f"Processing audio: {filename}")
-        _noise_service.process_audio(str(input_path), str(output_path))
+        # Process audio in memory, straight from the upload stream
+        logger.debug("Processing audio: %s", filename)
+        output_buffer = io.BytesIO()
+        _noise_service.process_audio(file.stream, output_buffer)
         
-        # Send denoised file back
-        logger.info(f"Sending denoised file: {filename}")
+        # Send denoised audio back in a single write with Content-Length,
+        # instead of send_file's 8KB file-wrapper chunks
+        logger.debug("Sending denoised file: %s", filename)
         
-        response = send_file(
-            str(output_path),
+        return Response(
+            output_buffer.getvalue(),
             mimetype='audio/wav',
-            as_attachment=True,
-            download_name=f'denoised_{filename}'
+            headers={
+                'Content-Disposition': f'attachment; filename=denoised_{filename}'
+            }
         )
         
-        # Clean up files after sending
-        @response.call_on_close
-        def cleanup():
-            try:
-                if input_path and input_path.exists():
-                    input_path.unlink()
-                    logger.info(f"Cleaned up input file: {input_path}")
-                if output_path and output_path.exists():
-                    output_path.unlink()
-                    logger.info(f"Cleaned up output file: {output_path}")
-            except Exception as e:
-                logger.error(f"Error cleaning up files: {e}")
-        
-        return response
-        
     except FileNotFoundError as e:
         logger.error(f"File not found: {e}")
         return jsonify({
@@ -151,18 +135,14 @@ def denoise_audio():
             'message': str(e)
         }), 400
         
+    except HTTPException:
+        # e.g. 413 from parsing a chunked body over MAX_CONTENT_LENGTH;
+        # let the registered error handlers answer it
+        raise
+        
     except Exception as e:
         logger.error(f"Error processing request: {e}")
         
-        # Clean up files on error
-        try:
-            if input_path and input_path.exists():
-                input_path.unlink()
-            if output_path and output_path.exists():
-                output_path.unlink()
-        except:
-            pass
-        
         return jsonify({
             'error': 'Internal server error',
             'message': str(e)
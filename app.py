@@ -22,15 +22,27 @@ def create_app(config_name='default'):
     config_obj = get_config() if config_name == 'default' else get_config()
     app.config.from_object(config_obj)
     
-    # Enable CORS
-    CORS(app, origins=app.config['CORS_ORIGINS'])
+    # Enable CORS (preflight cached so uploads skip the extra OPTIONS)
+    CORS(
+        app,
+        origins=app.config['CORS_ORIGINS'],
+        methods=['GET', 'POST'],
+        allow_headers=['Content-Type'],
+        max_age=app.config['CORS_MAX_AGE']
+    )
     
     # Initialize service layer
     logger.info("Initializing Noise Reduction Service...")
     try:
         noise_service = NoiseReductionService(
             model_path=app.config['MODEL_PATH'],
-            sample_rate=app.config['SAMPLE_RATE']
+            sample_rate=app.config['SAMPLE_RATE'],
+            backend=app.config['INFERENCE_BACKEND'],
+            jit_compile=app.config['XLA_JIT'],
+            max_batch_size=app.config['BATCH_SIZE'],
+            stream_min_seconds=app.config['STREAM_MIN_SECONDS'],
+            stream_chunk_frames=app.config['STREAM_CHUNK_FRAMES'],
+            intra_op_threads=app.config['TF_INTRA_OP_THREADS']
         )
         logger.info("Service initialized successfully")
     except Exception as e:
@@ -48,7 +60,7 @@ def create_app(config_name='default'):
 
 
 if __name__ == '__main__':
-    # Create app
+    # Development server only - use gunicorn with wsgi.py in production
     app = create_app()
     
     # Start server
@@ -23,7 +23,6 @@ class Config:
     """Base configuration"""
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max file size
-    UPLOAD_FOLDER = Path(__file__).parent / 'uploads'
     ALLOWED_EXTENSIONS = {'wav'}
     
     # Model settings
@@ -32,8 +31,28 @@ class Config:
     BLOCK_LEN = BLOCK_LEN
     BLOCK_SHIFT = BLOCK_SHIFT
     
+    # Inference runtime: 'keras' or 'tflite' (dynamic-range INT8 quantized)
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'keras').lower()
+    # XLA-compile the Keras graph (recompiles for each new input length)
+    XLA_JIT = os.getenv('XLA_JIT', 'False').lower() == 'true'
+    
+    # TF intra-op threads per process; default splits the CPU cores evenly
+    # across gunicorn workers to avoid oversubscription
+    TF_INTRA_OP_THREADS = int(os.getenv(
+        'TF_INTRA_OP_THREADS',
+        max(1, (os.cpu_count() or 1) // int(os.getenv('WEB_CONCURRENCY', 1)))
+    ))
+    
+    # Dynamic batching of concurrent requests
+    BATCH_SIZE = int(os.getenv('BATCH_SIZE', 4))
+    
+    # Clips at least this long are streamed through the stateful model
+    STREAM_MIN_SECONDS = float(os.getenv('STREAM_MIN_SECONDS', 10))
+    STREAM_CHUNK_FRAMES = int(os.getenv('STREAM_CHUNK_FRAMES', 250))  # ~2s
+    
     # CORS settings for ESP32
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
+    CORS_MAX_AGE = int(os.getenv('CORS_MAX_AGE', 600))  # Cache preflight 10 min
     
     # Server settings
     HOST = os.getenv('FLASK_HOST', '0.0.0.0')
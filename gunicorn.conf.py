@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration for Noise Reduction Service
+"""
+import multiprocessing
+import os
+
+# Server socket
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', 5000)}"
+
+# Worker processes (one model instance per worker, sized to CPU count)
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Workers read this to split CPU cores between their TF thread pools
+os.environ['WEB_CONCURRENCY'] = str(workers)
+worker_class = 'sync'
+
+# Request threads per worker; more than one lets concurrent requests in a
+# worker share a batched inference call
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+
+# Long clips can take a while to denoise
+timeout = 120
+
+# Do not preload the app in the master: the TF runtime is not fork-safe,
+# so every worker imports wsgi.py and loads its own model after fork.
+preload_app = False
+
+
+def post_fork(server, worker):
+    """Log worker start; the model is loaded when the worker imports the app"""
+    server.log.info(f"Worker spawned (pid: {worker.pid}), loading model")
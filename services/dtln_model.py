@@ -37,15 +37,13 @@ class InstantLayerNormalization(Layer):
         )
 
     def call(self, inputs):
-        mean = tf.math.reduce_mean(inputs, axis=[-1], keepdims=True)
-        variance = tf.math.reduce_mean(
-            tf.math.square(inputs - mean), axis=[-1], keepdims=True
+        # One-pass mean/variance and a single fused scale-and-shift
+        mean, variance = tf.nn.moments(inputs, axes=[-1], keepdims=True)
+        return tf.nn.batch_normalization(
+            inputs, mean, variance,
+            offset=self.beta, scale=self.gamma,
+            variance_epsilon=self.epsilon
         )
-        std = tf.math.sqrt(variance + self.epsilon)
-        outputs = (inputs - mean) / std
-        outputs = outputs * self.gamma
-        outputs = outputs + self.beta
-        return outputs
 
 
 class DTLN_model:
@@ -58,6 +56,8 @@ class DTLN_model:
 
     def __init__(self):
         self.model = None
+        self.model_stateful = None
+        self.model_frames = None
         # Model hyperparameters (must match training configuration)
         self.activation = 'sigmoid'
         self.numUnits = 128
@@ -71,20 +71,25 @@ class DTLN_model:
     # ---- Signal processing layers ----
 
     def stftLayer(self, x):
-        """STFT: returns [magnitude, phase]"""
+        """STFT: returns [magnitude, complex spectrum]"""
         frames = tf.signal.frame(x, self.blockLen, self.block_shift)
         stft_dat = tf.signal.rfft(frames)
-        mag = tf.abs(stft_dat)
-        phase = tf.math.angle(stft_dat)
-        return [mag, phase]
+        return [tf.abs(stft_dat), stft_dat]
+
+    def stftLogLayer(self, x):
+        """STFT: returns [log-magnitude, complex spectrum]"""
+        frames = tf.signal.frame(x, self.blockLen, self.block_shift)
+        stft_dat = tf.signal.rfft(frames)
+        return [tf.math.log(tf.abs(stft_dat) + self.eps), stft_dat]
 
     def ifftLayer(self, x):
-        """Inverse FFT from [magnitude, phase] to time-domain frames."""
-        s1_stft = (
-            tf.cast(x[0], tf.complex64)
-            * tf.exp(1j * tf.cast(x[1], tf.complex64))
-        )
-        return tf.signal.irfft(s1_stft)
+        """
+        Apply a magnitude mask to [mask, complex spectrum] and inverse FFT.
+        
+        Equivalent to rebuilding the spectrum from masked magnitude and the
+        original phase, without the angle / exp round trip.
+        """
+        return tf.signal.irfft(tf.cast(x[0], tf.complex64) * x[1])
 
     def overlapAddLayer(self, x):
         """Overlap-and-add to reconstruct waveform from frames."""
@@ -108,28 +113,55 @@ class DTLN_model:
         """
         Build the DTLN model for batch inference.
         
+        Besides self.model (waveform out), sets self.model_frames, which
+        shares the same layers but stops before overlap-add and returns the
+        decoded (batch, frames, blockLen) frames. Batched callers use it
+        to overlap-add each clip over its own frames only.
+        
         Args:
             norm_stft: If True, apply log-magnitude normalization (must match
                        the setting used during training).
         """
         # Input: time-domain waveform
         time_dat = Input(batch_shape=(None, None))
+        decoded_frames = self._build_graph(time_dat, norm_stft)
+        estimated_sig = Lambda(self.overlapAddLayer)(decoded_frames)
+        self.model = Model(inputs=time_dat, outputs=estimated_sig)
+        self.model_frames = Model(inputs=time_dat, outputs=decoded_frames)
 
-        # STFT
-        mag, angle = Lambda(self.stftLayer)(time_dat)
+    def build_DTLN_model_stateful(self, norm_stft=False):
+        """
+        Build the stateful DTLN model for chunked streaming inference.
+        
+        Takes one chunk of waveform at a time (batch size 1) and keeps the
+        LSTM states between calls. Feeding chunks that overlap by
+        blockLen - block_shift samples and summing the outputs at their
+        offsets reproduces the batch model output. Has the same weight
+        layout as the batch model.
+        
+        Args:
+            norm_stft: If True, apply log-magnitude normalization (must match
+                       the setting used during training).
+        """
+        time_dat = Input(batch_shape=(1, None))
+        decoded_frames = self._build_graph(time_dat, norm_stft, stateful=True)
+        estimated_sig = Lambda(self.overlapAddLayer)(decoded_frames)
+        self.model_stateful = Model(inputs=time_dat, outputs=estimated_sig)
 
-        # Optional log-magnitude normalization
+    def _build_graph(self, time_dat, norm_stft, stateful=False):
+        """Build the DTLN layers on a waveform input, up to decoded frames."""
+        # STFT, with optional log-magnitude normalization
         if norm_stft:
-            mag_norm = InstantLayerNormalization()(tf.math.log(mag + 1e-7))
+            log_mag, stft_dat = Lambda(self.stftLogLayer)(time_dat)
+            mag_norm = InstantLayerNormalization()(log_mag)
         else:
-            mag_norm = mag
+            mag_norm, stft_dat = Lambda(self.stftLayer)(time_dat)
 
         # First separation core (frequency domain)
         mask_1 = self.seperation_kernel(
-            self.numLayer, (self.blockLen // 2 + 1), mag_norm
+            self.numLayer, (self.blockLen // 2 + 1), mag_norm, stateful
         )
-        estimated_mag = Multiply()([mag, mask_1])
-        estimated_frames_1 = Lambda(self.ifftLayer)([estimated_mag, angle])
+        estimated_frames_1 = Lambda(self.ifftLayer)([mask_1, stft_dat])
 
         # Learned encoder
         encoded_frames = Conv1D(
@@ -139,14 +171,11 @@ class DTLN_model:
 
         # Second separation core (learned feature domain)
         mask_2 = self.seperation_kernel(
-            self.numLayer, self.encoder_size, encoded_frames_norm
+            self.numLayer, self.encoder_size, encoded_frames_norm, stateful
         )
         estimated = Multiply()([encoded_frames, mask_2])
 
-        # Decoder back to time domain
-        decoded_frames = Conv1D(
+        # Decoder back to time-domain frames
+        return Conv1D(
             self.blockLen, 1, padding='causal', use_bias=False
         )(estimated)
-        estimated_sig = Lambda(self.overlapAddLayer)(decoded_frames)
-
-        self.model = Model(inputs=time_dat, outputs=estimated_sig)
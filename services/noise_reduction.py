@@ -1,14 +1,41 @@
 import os
+import time
+import queue
 import logging
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
 import soundfile as sf
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock, the atomic rename still applies
+    fcntl = None
+
+# TF runtime options, must be set before TensorFlow is imported
+os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '1')
+os.environ.setdefault('TF_NUM_INTEROP_THREADS', '1')
+
 import tensorflow as tf
-from pathlib import Path
 
 from services.dtln_model import DTLN_model
 
 logger = logging.getLogger(__name__)
 
+# Guards singleton creation and model loading across request threads
+_LOCK = threading.Lock()
+
+# Bumped whenever the graph converted to TFLite changes, so stale caches
+# are not picked up (v1 outputs decoded frames, not the waveform)
+_TFLITE_CACHE_VERSION = 'frames-v1'
+
+# Accepted upload containers and encodings (WAV format tags 1, 3, 0xFFFE)
+_WAV_FORMATS = {'WAV', 'WAVEX', 'RF64'}
+_WAV_SUBTYPES = {
+    'PCM_U8', 'PCM_S8', 'PCM_16', 'PCM_24', 'PCM_32', 'FLOAT', 'DOUBLE'
+}
+
 
 class NoiseReductionService:
     """
@@ -31,30 +58,88 @@ class NoiseReductionService:
     
     def __new__(cls, *args, **kwargs):
         """Singleton pattern to cache model in memory"""
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
+        with _LOCK:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
+                cls._instance._initialized = False
         return cls._instance
     
-    def __init__(self, model_path, sample_rate=16000):
+    def __init__(self, model_path, sample_rate=16000, backend='keras',
+                 jit_compile=False, max_batch_size=4,
+                 stream_min_seconds=10, stream_chunk_frames=250,
+                 intra_op_threads=0):
         """
         Initialize the noise reduction service
         
         Args:
             model_path: Path to trained DTLN model weights (.h5 file)
             sample_rate: Expected sample rate (default: 16000 Hz)
+            backend: Inference runtime, 'keras' or 'tflite' (default: 'keras')
+            jit_compile: Compile the Keras inference graph with XLA. XLA
+                         recompiles for every new input length.
+            max_batch_size: Max number of concurrent clips run in one batch
+            stream_min_seconds: Clips at least this long are run chunk by
+                                chunk through the stateful Keras model.
+                                Not used with the TFLite backend.
+            stream_chunk_frames: Number of STFT frames per streamed chunk
+            intra_op_threads: TF intra-op thread pool size (0 = TF default)
         """
-        if self._initialized:
-            return
+        with _LOCK:
+            if self._initialized:
+                return
             
-        self.model_path = model_path
-        self.sample_rate = sample_rate
-        self.model = None
-        self.dtln = None
-        
-        # Load model
-        self._load_model()
-        self._initialized = True
+            self.model_path = model_path
+            self.sample_rate = sample_rate
+            self.backend = backend
+            self.jit_compile = jit_compile
+            self.model = None
+            self.model_frames = None
+            self.dtln = None
+            self._infer = None
+            self._interpreter = None
+            self._interpreter_shape = None
+            self.max_batch_size = max(1, max_batch_size)
+            self._queue = queue.Queue()
+            self.stream_min_samples = int(stream_min_seconds * sample_rate)
+            self.stream_chunk_frames = max(1, stream_chunk_frames)
+            self.model_stateful = None
+            self._infer_stateful = None
+            
+            # Reusable batch input buffer, only touched by the inference thread.
+            # Sized for BATCH_SIZE clips just under the streaming threshold;
+            # larger batches (e.g. long clips on the TFLite backend) get a
+            # temporary array so the worker does not keep that memory.
+            self._batch_buf = np.empty(
+                self.max_batch_size * self.stream_min_samples, dtype=np.float32
+            )
+            
+            # Tune TF runtime, then load model
+            self._configure_runtime(intra_op_threads)
+            self._load_model()
+            
+            # Single inference thread shared by all request threads: model
+            # calls run one at a time, and queued clips are batched there
+            self._pool = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='dtln-infer'
+            )
+            self._initialized = True
+    
+    def _configure_runtime(self, intra_op_threads):
+        """Set TF thread pools and XLA auto-clustering before first use"""
+        try:
+            if intra_op_threads > 0:
+                tf.config.threading.set_intra_op_parallelism_threads(
+                    intra_op_threads
+                )
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+            if self.jit_compile:
+                tf.config.optimizer.set_jit('autoclustering')
+            
+            logger.info(f"TF intra-op threads: {intra_op_threads or 'default'}")
+            
+        except RuntimeError as e:
+            # TF runtime was already initialized by an earlier op
+            logger.warning(f"Could not configure TF runtime: {e}")
     
     def _load_model(self):
         """Load DTLN model from weights file"""
@@ -76,38 +161,157 @@ class NoiseReductionService:
             # Load weights
             self.dtln.model.load_weights(self.model_path)
             self.model = self.dtln.model
+            self.model_frames = self.dtln.model_frames
+            
+            # Single traced graph for any batch/length, bypassing predict().
+            # Returns decoded frames; overlap-add is done per clip.
+            self._infer = tf.function(
+                lambda x: self.model_frames(x, training=False),
+                input_signature=[tf.TensorSpec([None, None], tf.float32)],
+                jit_compile=self.jit_compile
+            )
+            
+            # Stateful copy for streaming long clips chunk by chunk
+            self.dtln.build_DTLN_model_stateful(norm_stft=norm_stft)
+            self.model_stateful = self.dtln.model_stateful
+            self.model_stateful.set_weights(self.model.get_weights())
+            self._infer_stateful = tf.function(
+                lambda x: self.model_stateful(x, training=False),
+                input_signature=[tf.TensorSpec([1, None], tf.float32)]
+            )
             
             logger.info("Model loaded successfully")
             logger.info(f"Model uses normalization: {norm_stft}")
             
+            if self.backend == 'tflite':
+                self._load_tflite()
+            
+            # Trace graphs / init kernels before the first real request
+            self._warm_up()
+            
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             raise
     
-    def process_audio(self, input_path, output_path):
+    def _warm_up(self):
+        """Run both models once on one second of silence"""
+        start = time.monotonic()
+        silence = np.zeros((1, self.sample_rate), dtype=np.float32)
+        
+        self._run_inference(silence)
+        # States are reset at the start of every streamed clip
+        self._infer_stateful(tf.constant(silence))
+        
+        logger.info(f"Model warm-up took {time.monotonic() - start:.2f}s")
+    
+    def _load_tflite(self):
+        """
+        Convert the Keras model to a dynamic-range quantized TFLite model
+        
+        The converted model is cached next to the weights file, under a
+        name that includes _TFLITE_CACHE_VERSION, and reused as long as it
+        is newer than the weights and outputs frames. Gunicorn workers boot at
+        the same time, so conversion is serialized with a file lock and
+        the cache is written to a temp file and renamed into place: only
+        one worker converts, and no worker reads a partial file. Falls
+        back to the Keras backend if conversion fails.
+        """
+        tflite_path = (
+            f"{os.path.splitext(self.model_path)[0]}"
+            f".{_TFLITE_CACHE_VERSION}.tflite"
+        )
+        
+        try:
+            with open(tflite_path + '.lock', 'w') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                
+                interpreter = None
+                if os.path.exists(tflite_path) and \
+                        os.path.getmtime(tflite_path) >= os.path.getmtime(self.model_path):
+                    logger.info(f"Loading cached TFLite model from {tflite_path}")
+                    interpreter = self._open_interpreter(tflite_path)
+                
+                if interpreter is None:
+                    self._convert_tflite(tflite_path)
+                    interpreter = self._open_interpreter(tflite_path)
+                if interpreter is None:
+                    raise ValueError("Converted TFLite model does not output frames")
+                
+                self._interpreter = interpreter
+                self._interpreter_shape = None
+            
+        except Exception as e:
+            logger.warning(f"TFLite backend unavailable, using Keras: {e}")
+            self.backend = 'keras'
+            self._interpreter = None
+    
+    @staticmethod
+    def _open_interpreter(tflite_path):
+        """Open a TFLite model, or return None if it does not output frames"""
+        interpreter = tf.lite.Interpreter(model_path=tflite_path)
+        output_shape = interpreter.get_output_details()[0]['shape']
+        if len(output_shape) != 3:
+            logger.warning(
+                f"TFLite model {tflite_path} has output shape {output_shape}, "
+                f"expected (batch, frames, blockLen)"
+            )
+            return None
+        return interpreter
+    
+    def _convert_tflite(self, tflite_path):
+        """Convert the frames model and atomically write it to tflite_path"""
+        logger.info("Converting model to TFLite (dynamic-range INT8)")
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model_frames)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        # STFT / complex ops are not TFLite builtins
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS,
+            tf.lite.OpsSet.SELECT_TF_OPS,
+        ]
+        tflite_model = converter.convert()
+        
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(tflite_path) or '.',
+            prefix=os.path.basename(tflite_path) + '.',
+            suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(tflite_model)
+            os.replace(tmp_path, tflite_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        
+        logger.info(f"TFLite model cached at {tflite_path}")
+    
+    def process_audio(self, input_file, output_file):
         """
         Process audio file to remove noise
         
         Args:
-            input_path: Path to input noisy audio file
-            output_path: Path to save denoised audio file
+            input_file: Path or readable file-like object with noisy audio
+            output_file: Path or writable file-like object for denoised WAV
             
         Returns:
-            output_path: Path to the denoised audio file
+            output_file: The path or file-like object written to
             
         Raises:
             FileNotFoundError: If input file doesn't exist
             ValueError: If audio format is invalid
         """
         try:
-            logger.info(f"Processing audio file: {input_path}")
+            logger.debug("Processing audio file: %s", input_file)
             
             # Validate input file exists
-            if not os.path.exists(input_path):
-                raise FileNotFoundError(f"Input file not found: {input_path}")
+            if isinstance(input_file, (str, os.PathLike)) and \
+                    not os.path.exists(input_file):
+                raise FileNotFoundError(f"Input file not found: {input_file}")
             
-            # Read audio file
-            audio, fs = sf.read(input_path)
+            # Validate WAV header before paying for a full decode
+            _, fs = self._read_wav_header(input_file)
             
             # Validate sample rate
             if fs != self.sample_rate:
@@ -116,24 +320,64 @@ class NoiseReductionService:
                     f"rate ({self.sample_rate} Hz). Quality may be affected."
                 )
             
-            # Ensure mono audio
-            if audio.ndim > 1:
-                logger.info("Converting stereo to mono")
-                audio = np.mean(audio, axis=1)
+            # Read audio file (decoded straight to float32)
+            audio, fs = sf.read(input_file, dtype='float32')
             
-            # Process audio
+            # Process audio (converted to mono inside)
             denoised_audio = self.process_audio_data(audio)
             
-            # Save denoised audio
-            sf.write(output_path, denoised_audio, self.sample_rate)
+            # Save denoised audio as 16-bit PCM
+            sf.write(
+                output_file, denoised_audio, self.sample_rate,
+                format='WAV', subtype='PCM_16'
+            )
             
-            logger.info(f"Denoised audio saved to: {output_path}")
-            return output_path
+            logger.debug("Denoised audio saved to: %s", output_file)
+            return output_file
             
         except Exception as e:
             logger.error(f"Error processing audio: {e}")
             raise
     
+    @staticmethod
+    def _read_wav_header(input_file):
+        """
+        Read channel count and sample rate from a WAV header
+        
+        Uses sf.info, which only parses the header. File-like objects are
+        rewound to where they were, so the same stream can be decoded
+        afterwards.
+        
+        Returns:
+            (channels, sample_rate)
+            
+        Raises:
+            ValueError: If the data is not an uncompressed PCM or IEEE float
+                        WAV file
+        """
+        position = None
+        if not isinstance(input_file, (str, os.PathLike)):
+            position = input_file.tell()
+        
+        try:
+            info = sf.info(input_file)
+        except RuntimeError as e:
+            # libsndfile messages include object reprs; keep them in the log
+            logger.warning(f"Could not read WAV header: {e}")
+            raise ValueError("Could not read WAV header") from e
+        finally:
+            if position is not None:
+                input_file.seek(position)
+        
+        if info.format not in _WAV_FORMATS:
+            raise ValueError(f"Not a WAV file (format: {info.format})")
+        if info.subtype not in _WAV_SUBTYPES:
+            raise ValueError(
+                f"Unsupported WAV encoding {info.subtype}, "
+                f"only PCM or float WAV is accepted"
+            )
+        return info.channels, info.samplerate
+    
     def process_audio_data(self, audio):
         """
         Process audio data using DTLN model
@@ -152,33 +396,182 @@ class NoiseReductionService:
             if not isinstance(audio, np.ndarray):
                 raise ValueError("Audio must be a numpy array")
             
-            # Ensure audio is float32
-            audio = audio.astype('float32')
-            
             # Ensure 1D array
             if audio.ndim > 1:
-                audio = np.mean(audio, axis=1)
-            
-            # Add batch dimension
-            audio_batch = np.expand_dims(audio, axis=0)
+                logger.debug("Converting stereo to mono")
+                audio = self._to_mono(audio)
             
-            # Run inference
-            logger.info(f"Running inference on audio shape: {audio_batch.shape}")
-            denoised_audio = self.model.predict(audio_batch, verbose=0)
-            
-            # Remove batch dimension
-            denoised_audio = np.squeeze(denoised_audio)
+            # Run inference: stream long clips, batch short ones with
+            # other concurrent requests. Streaming needs the stateful Keras
+            # model, so with TFLite every clip takes the batch path.
+            logger.debug("Running inference on audio shape: %s", audio.shape)
+            if self._interpreter is None and \
+                    len(audio) >= self.stream_min_samples:
+                denoised_audio = self._pool.submit(
+                    self._stream_inference, audio
+                ).result()
+            else:
+                future = Future()
+                self._queue.put((audio, future))
+                self._pool.submit(self._drain_queue)
+                denoised_audio = future.result()
             
             # Clip to valid range [-1, 1]
-            denoised_audio = np.clip(denoised_audio, -1.0, 1.0)
+            np.clip(denoised_audio, -1.0, 1.0, out=denoised_audio)
             
-            logger.info(f"Inference complete. Output shape: {denoised_audio.shape}")
+            logger.debug("Inference complete. Output shape: %s", denoised_audio.shape)
             return denoised_audio
             
         except Exception as e:
             logger.error(f"Error during model inference: {e}")
             raise
     
+    @staticmethod
+    def _to_mono(audio):
+        """Downmix (samples, channels) audio to a float32 mono array"""
+        if audio.shape[1] == 2:
+            # One pass, no reduction temporaries
+            mono = np.add(audio[:, 0], audio[:, 1], dtype=np.float32)
+            mono *= 0.5
+            return mono
+        return np.mean(audio, axis=1, dtype=np.float32)
+    
+    def _drain_queue(self):
+        """
+        Collect queued clips into one batch and run it
+        
+        Runs on the inference thread, one task per queued clip. Only clips
+        already queued are taken, without waiting for more: those that
+        arrive while the thread is busy are picked up together by the next
+        task, and the tasks that find the queue already empty return.
+        """
+        batch = []
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        if batch:
+            self._run_batch(batch)
+    
+    def _run_batch(self, batch):
+        """
+        Run a list of (audio, future) pairs as one zero-padded batch
+        
+        The model returns decoded frames, and each clip is overlap-added
+        over its own frame count only. Frames past that still overlap the
+        clip's real tail samples, so summing them in (as overlap-adding the
+        whole padded row would) changes the last blockLen - block_shift
+        output samples depending on the other clips in the batch.
+        """
+        try:
+            max_len = max(len(audio) for audio, _ in batch)
+            size = len(batch) * max_len
+            if size <= len(self._batch_buf):
+                buffer = self._batch_buf
+            else:
+                buffer = np.empty(size, dtype=np.float32)
+            
+            # Contiguous (batch, max_len) view; the copy also casts to float32
+            audio_batch = buffer[:size].reshape(len(batch), max_len)
+            for row, (audio, _) in zip(audio_batch, batch):
+                np.copyto(row[:len(audio)], audio, casting='unsafe')
+                row[len(audio):] = 0.0
+            
+            frames_batch = self._run_inference(audio_batch)
+            
+            for frames, (audio, future) in zip(frames_batch, batch):
+                num_frames = self._num_frames(len(audio))
+                future.set_result(self._overlap_add(frames[:num_frames]))
+                
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+    
+    def _stream_inference(self, audio):
+        """
+        Run a long clip through the stateful model chunk by chunk
+        
+        Each chunk covers stream_chunk_frames STFT frames and overlaps the
+        previous one by blockLen - block_shift samples, so frames line up
+        with the batch model. LSTM states carry over between chunks and
+        chunk outputs are overlap-added into one output buffer, keeping the
+        working set bounded by the chunk size instead of the clip length.
+        """
+        block_len = self.dtln.blockLen
+        block_shift = self.dtln.block_shift
+        output = np.zeros(self._output_length(len(audio)), dtype=np.float32)
+        num_frames = self._num_frames(len(audio))
+        
+        # Runs on the inference thread, so the LSTM states are not shared
+        for layer in self.model_stateful.layers:
+            if getattr(layer, 'stateful', False):
+                layer.reset_states()
+        
+        for first in range(0, num_frames, self.stream_chunk_frames):
+            count = min(self.stream_chunk_frames, num_frames - first)
+            start = first * block_shift
+            end = start + (count - 1) * block_shift + block_len
+            
+            chunk = self._infer_stateful(
+                tf.constant(audio[np.newaxis, start:end], dtype=tf.float32)
+            ).numpy()[0]
+            output[start:end] += chunk
+        
+        return output
+    
+    def _num_frames(self, num_samples):
+        """Number of STFT frames DTLN takes from an input length"""
+        if num_samples < self.dtln.blockLen:
+            return 0
+        return 1 + (num_samples - self.dtln.blockLen) // self.dtln.block_shift
+    
+    def _output_length(self, num_samples):
+        """Number of output samples DTLN produces for an input length"""
+        num_frames = self._num_frames(num_samples)
+        if num_frames == 0:
+            return 0
+        return (num_frames - 1) * self.dtln.block_shift + self.dtln.blockLen
+    
+    def _overlap_add(self, frames):
+        """Overlap-add (frames, blockLen) decoded frames into a waveform"""
+        block_shift = self.dtln.block_shift
+        hops = self.dtln.blockLen // block_shift
+        num_frames = len(frames)
+        if num_frames == 0:
+            return np.zeros(0, dtype=np.float32)
+        
+        # Each frame spans `hops` consecutive block_shift segments
+        segments = frames.reshape(num_frames, hops, block_shift)
+        output = np.zeros((num_frames - 1 + hops, block_shift), dtype=np.float32)
+        for i in range(hops):
+            output[i:i + num_frames] += segments[:, i]
+        return output.reshape(-1)
+    
+    def _run_inference(self, audio_batch):
+        """Run the model on a (batch, samples) float32 array"""
+        if self._interpreter is None:
+            return self._infer(tf.constant(audio_batch)).numpy()
+        
+        # The interpreter is stateful; only the inference thread uses it
+        interpreter = self._interpreter
+        input_index = interpreter.get_input_details()[0]['index']
+        
+        # Input length varies per clip, so resize before each new shape
+        if audio_batch.shape != self._interpreter_shape:
+            interpreter.resize_tensor_input(
+                input_index, audio_batch.shape, strict=False
+            )
+            interpreter.allocate_tensors()
+            self._interpreter_shape = audio_batch.shape
+        
+        interpreter.set_tensor(input_index, audio_batch)
+        interpreter.invoke()
+        output_index = interpreter.get_output_details()[0]['index']
+        return interpreter.get_tensor(output_index)
+    
     def is_ready(self):
         """Check if service is ready to process audio"""
         return self.model is not None
@@ -195,6 +588,7 @@ class NoiseReductionService:
             "status": "ready",
             "model_path": self.model_path,
             "sample_rate": self.sample_rate,
+            "backend": self.backend,
             "input_shape": str(self.model.input_shape),
             "output_shape": str(self.model.output_shape)
         }
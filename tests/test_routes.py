@@ -0,0 +1,45 @@
+import io
+from unittest import mock
+
+import pytest
+
+pytest.importorskip('tensorflow')
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    with mock.patch.object(app_module, 'NoiseReductionService'):
+        app = app_module.create_app()
+    app.config['MAX_CONTENT_LENGTH'] = 1024
+    return app.test_client()
+
+
+def _multipart(payload):
+    return (
+        b'--b\r\nContent-Disposition: form-data; name="file"; '
+        b'filename="x.wav"\r\n\r\n' + payload + b'\r\n--b--\r\n'
+    )
+
+
+def test_oversized_upload_with_content_length_returns_413(client):
+    response = client.post(
+        '/denoise', data={'file': (io.BytesIO(b'0' * 4096), 'x.wav')}
+    )
+    assert response.status_code == 413
+    assert response.get_json()['error'] == 'File too large'
+
+
+def test_oversized_chunked_upload_returns_413(client):
+    response = client.post(
+        '/denoise',
+        input_stream=io.BytesIO(_multipart(b'0' * 4096)),
+        headers={
+            'Content-Type': 'multipart/form-data; boundary=b',
+            'Transfer-Encoding': 'chunked',
+        },
+        environ_overrides={'wsgi.input_terminated': True}
+    )
+    assert response.status_code == 413
+    assert response.get_json()['error'] == 'File too large'
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production servers.
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:application
+"""
+from app import create_app
+
+application = create_app()